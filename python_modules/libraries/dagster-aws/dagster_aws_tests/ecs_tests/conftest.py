@@ -1,11 +1,10 @@
 import boto3
-import moto
 import pytest
 
 from .stubbed_ecs import ThreadsafeStubbedEcs
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def region():
     return "us-east-1"
 
@@ -17,6 +16,8 @@ def ecs(region):
 
 @pytest.fixture
 def ec2(region):
+    import moto
+
     with moto.mock_ec2():
         yield boto3.resource("ec2", region_name=region)
 
@@ -38,5 +39,7 @@ def security_group(vpc):
 
 @pytest.fixture
 def secrets_manager(region):
+    import moto
+
     with moto.mock_secretsmanager():
         yield boto3.client("secretsmanager", region_name=region)
@@ -1,62 +1,146 @@
+import copy
 import json
-from collections import namedtuple
-from contextlib import contextmanager
-from typing import Any, Callable, ContextManager, Iterator, Mapping, Sequence
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, ContextManager, Iterator, Mapping, NamedTuple, Sequence
 
 import boto3
-import moto
+import dagster_aws.ecs.launcher
+import dagster_aws.ecs.tasks
 import pytest
+import yaml
 from dagster._core.definitions.job_definition import JobDefinition
 from dagster._core.host_representation.external import ExternalJob
+from dagster._core.host_representation.origin import ExternalJobOrigin
 from dagster._core.instance import DagsterInstance
+from dagster._core.launcher import RunLauncher
+from dagster._core.origin import JobPythonOrigin
 from dagster._core.storage.dagster_run import DagsterRun
 from dagster._core.test_utils import in_process_test_workspace, instance_for_test
 from dagster._core.types.loadable_target_origin import LoadableTargetOrigin
 from dagster._core.workspace.context import WorkspaceRequestContext
-from dagster._utils.warnings import disable_dagster_warnings
+from dagster._serdes import ConfigurableClassData
+from dagster_aws.ecs.tasks import CurrentEcsTaskMetadata
 
+from ..stubbed_ecs import ThreadsafeStubbedEcs
 from . import repo
 
-Secret = namedtuple("Secret", ["name", "arn"])
 
+class Secret(NamedTuple):
+    name: str
+    arn: str
 
-@pytest.fixture(autouse=True)
-def ignore_dagster_warnings() -> Iterator[None]:
-    with disable_dagster_warnings():
+
+_DEFAULT_RUN_LAUNCHER = {
+    "module": "dagster_aws.ecs",
+    "class": "EcsRunLauncher",
+    "config": {},
+}
+
+_CUSTOM_RUN_LAUNCHER = {
+    "module": "dagster_aws.ecs.test_utils",
+    "class": "CustomECSRunLauncher",
+    "config": {},
+}
+
+
+# These override the function-scoped AWS fixtures in the parent conftest. pytest 7 doesn't nest
+# packages, so package-scoped fixtures have to be defined here to be torn down when the launcher
+# tests finish rather than at the end of the session.
+@pytest.fixture(scope="package")
+def aws_mocks() -> Iterator[None]:
+    # moto costs tens of milliseconds to import on top of dagster_aws, so only pay for it
+    # when a test actually needs the mocks
+    import moto
+
+    # Enter every moto mock the launcher tests need together, once, so boto3's default session
+    # is only reset when the first one starts and the backends are shared across the package
+    with ExitStack() as stack:
+        stack.enter_context(moto.mock_ec2())
+        stack.enter_context(moto.mock_logs())
+        stack.enter_context(moto.mock_secretsmanager())
         yield
 
 
-@pytest.fixture
-def cloudwatch_client(region: str):
-    with moto.mock_logs():
-        yield boto3.client("logs", region_name=region)
+@pytest.fixture(scope="package")
+def ec2(aws_mocks, region: str):
+    return boto3.resource("ec2", region_name=region)
 
 
-@pytest.fixture
+@pytest.fixture(scope="package")
+def vpc(ec2):
+    return ec2.create_vpc(CidrBlock="10.0.0.0/16")
+
+
+@pytest.fixture(scope="package")
+def subnet(vpc):
+    return vpc.create_subnet(CidrBlock="10.0.0.0/24")
+
+
+@pytest.fixture(scope="package")
+def security_group(vpc):
+    return vpc.create_security_group(Description="test", GroupName="test")
+
+
+@pytest.fixture(scope="package")
+def secrets_manager(aws_mocks, region: str):
+    return boto3.client("secretsmanager", region_name=region)
+
+
+@pytest.fixture(scope="package")
+def cloudwatch_client(aws_mocks, region: str):
+    return boto3.client("logs", region_name=region)
+
+
+@pytest.fixture(scope="package")
 def log_group(cloudwatch_client) -> str:
     name = "/dagster-test/test-cloudwatch-logging"
     cloudwatch_client.create_log_group(logGroupName=name)
     return name
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def image() -> str:
     return "dagster:first"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def other_image() -> str:
     return "dagster:second"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def environment() -> Sequence[Mapping[str, str]]:
     return [{"name": "FOO", "value": "bar"}]
 
 
+@pytest.fixture(scope="package")
+def shared_ecs(region: str) -> ThreadsafeStubbedEcs:
+    return ThreadsafeStubbedEcs(region_name=region)
+
+
 @pytest.fixture
-def task_definition(ecs, image, environment):
-    return ecs.register_task_definition(
+def ecs(shared_ecs: ThreadsafeStubbedEcs, task) -> Iterator[ThreadsafeStubbedEcs]:
+    # The stub is shared so that the calling task only has to be registered once per package;
+    # roll its storage back after each test so registrations don't leak between tests
+    storage = shared_ecs.storage
+    snapshot = copy.deepcopy(
+        (storage.tasks, storage.task_definitions, storage.tags, storage.account_settings)
+    )
+
+    yield shared_ecs
+
+    storage.tasks, storage.task_definitions, storage.tags, storage.account_settings = snapshot
+
+    # Undoing a monkeypatch of one of the stub's methods stores the current thread's bound
+    # method on the instance, which would bypass the per-thread dispatch in __getattr__
+    for name in list(vars(shared_ecs)):
+        if name != "stubs":
+            delattr(shared_ecs, name)
+
+
+@pytest.fixture(scope="package")
+def task_definition(shared_ecs, image, environment):
+    return shared_ecs.register_task_definition(
         family="dagster",
         containerDefinitions=[
             {
@@ -83,14 +167,16 @@ def task_definition(ecs, image, environment):
     )["taskDefinition"]
 
 
-@pytest.fixture
-def assign_public_ip():
-    return True
+@pytest.fixture(scope="package")
+def assign_public_ip(request) -> bool:
+    # Tests can override this with indirect parametrization, in which case pytest caches one
+    # calling task per value instead of rebuilding it for every test
+    return getattr(request, "param", True)
 
 
-@pytest.fixture
-def task(ecs, subnet, security_group, task_definition, assign_public_ip):
-    return ecs.run_task(
+@pytest.fixture(scope="package")
+def task(shared_ecs, subnet, security_group, task_definition, assign_public_ip):
+    return shared_ecs.run_task(
         taskDefinition=task_definition["family"],
         networkConfiguration={
             "awsvpcConfiguration": {
@@ -102,54 +188,95 @@ def task(ecs, subnet, security_group, task_definition, assign_public_ip):
     )["tasks"][0]
 
 
-@pytest.fixture
-def stub_aws(ecs, ec2, secrets_manager, cloudwatch_client, monkeypatch):
-    def mock_client(*args, **kwargs):
-        if "ecs" in args:
-            return ecs
-        if "secretsmanager" in args:
-            return secrets_manager
-        if "logs" in args:
-            return cloudwatch_client
-        else:
-            raise Exception("Unexpected args")
+@pytest.fixture(scope="module")
+def stub_aws(shared_ecs, ec2, secrets_manager, cloudwatch_client) -> Iterator[None]:
+    # All of the stubbed clients are shared, so only patch boto3 once per module. This stays
+    # module-scoped so that boto3 is never left patched for tests outside of this package.
+    clients = {
+        "ecs": shared_ecs,
+        "secretsmanager": secrets_manager,
+        "logs": cloudwatch_client,
+    }
 
-    monkeypatch.setattr(boto3, "client", mock_client)
-    monkeypatch.setattr(boto3, "resource", lambda *args, **kwargs: ec2)
+    def mock_client(service_name, *args, **kwargs):
+        try:
+            return clients[service_name]
+        except KeyError:
+            raise Exception(f"Unexpected service {service_name}")
 
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(boto3, "client", mock_client)
+        monkeypatch.setattr(boto3, "resource", lambda *args, **kwargs: ec2)
+        yield
 
-@pytest.fixture
-def stub_ecs_metadata(task, monkeypatch, requests_mock):
-    container_uri = "http://metadata_host"
-    monkeypatch.setenv("ECS_CONTAINER_METADATA_URI_V4", container_uri)
-    container = task["containers"][0]["name"]
-    requests_mock.get(container_uri, json={"Name": container})
-
-    task_uri = container_uri + "/task"
-    requests_mock.get(
-        task_uri,
-        json={
-            "Cluster": task["clusterArn"],
-            "TaskARN": task["taskArn"],
-        },
-    )
+
+@pytest.fixture(scope="package", autouse=True)
+def disable_ec2_metadata() -> Iterator[None]:
+    # Never let botocore probe the EC2 instance metadata service for credentials or region
+    # while these tests run, without changing the environment of later test packages
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("AWS_EC2_METADATA_DISABLED", "true")
+        yield
+
+
+@pytest.fixture(scope="module")
+def stub_ecs_metadata(task) -> Iterator[None]:
+    # Stub out the functions that read the ECS task metadata endpoint rather than intercepting
+    # the HTTP requests they make. They only depend on the package-scoped task, so patch them
+    # once per module.
+    container_name = task["containers"][0]["name"]
+    task_metadata = CurrentEcsTaskMetadata(cluster=task["clusterArn"], task_arn=task["taskArn"])
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(
+            dagster_aws.ecs.tasks, "current_ecs_container_name", lambda: container_name
+        )
+        monkeypatch.setattr(
+            dagster_aws.ecs.launcher, "get_current_ecs_task_metadata", lambda: task_metadata
+        )
+        yield
+
+
+@pytest.fixture(scope="package")
+def shared_instance(tmp_path_factory: pytest.TempPathFactory) -> Iterator[DagsterInstance]:
+    # Building an instance (storage schemas, temp dirs) dominates setup time, so share a single
+    # one across the package and only swap out its run launcher per test. tmp_path_factory
+    # gives each pytest-xdist worker its own storage directory. The swapped launchers never
+    # read DAGSTER_HOME, so leave it alone rather than pointing later packages at this one.
+    with instance_for_test(
+        temp_dir=str(tmp_path_factory.mktemp("dagster_home")), set_dagster_home=False
+    ) as dagster_instance:
+        yield dagster_instance
+
+
+@contextmanager
+def run_launcher_swapped(
+    instance: DagsterInstance, run_launcher: Mapping[str, Any]
+) -> Iterator[DagsterInstance]:
+    launcher = ConfigurableClassData(
+        run_launcher["module"], run_launcher["class"], yaml.dump(run_launcher["config"])
+    ).rehydrate(as_type=RunLauncher)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(instance, "_run_launcher", launcher)
+        launcher.register_instance(instance)
+        yield instance
 
 
 @pytest.fixture
-def instance_cm(stub_aws, stub_ecs_metadata) -> Callable[..., ContextManager[DagsterInstance]]:
+def instance_cm(
+    shared_instance: DagsterInstance, ecs, stub_aws, stub_ecs_metadata
+) -> Iterator[Callable[..., ContextManager[DagsterInstance]]]:
     @contextmanager
     def cm(config=None):
-        overrides = {
-            "run_launcher": {
-                "module": "dagster_aws.ecs",
-                "class": "EcsRunLauncher",
-                "config": {**(config or {})},
-            }
-        }
-        with instance_for_test(overrides) as dagster_instance:
+        run_launcher = (
+            _DEFAULT_RUN_LAUNCHER if config is None else {**_DEFAULT_RUN_LAUNCHER, "config": config}
+        )
+        with run_launcher_swapped(shared_instance, run_launcher) as dagster_instance:
             yield dagster_instance
 
-    return cm
+    yield cm
+
+    shared_instance.wipe()
 
 
 @pytest.fixture
@@ -195,6 +322,13 @@ def instance_with_resources(
 def instance_dont_use_current_task(
     instance_cm: Callable[..., ContextManager[DagsterInstance]], subnet, monkeypatch
 ) -> Iterator[DagsterInstance]:
+    # Not running in an ECS task, so any attempt to read the current task's metadata fails
+    def not_in_ecs_task():
+        raise Exception("Not running in an ECS task")
+
+    monkeypatch.setattr(dagster_aws.ecs.tasks, "current_ecs_container_name", not_in_ecs_task)
+    monkeypatch.setattr(dagster_aws.ecs.launcher, "get_current_ecs_task_metadata", not_in_ecs_task)
+
     with instance_cm(
         config={
             "use_current_ecs_task_config": False,
@@ -209,8 +343,6 @@ def instance_dont_use_current_task(
             },
         }
     ) as dagster_instance:
-        # Not running in an ECS task
-        monkeypatch.setenv("ECS_CONTAINER_METADATA_URI_V4", None)
         yield dagster_instance
 
 
@@ -232,80 +364,125 @@ def instance_fargate_spot(
         yield dagster_instance
 
 
-@pytest.fixture
-def workspace(instance: DagsterInstance, image: str) -> Iterator[WorkspaceRequestContext]:
+@pytest.fixture(scope="session")
+def loadable_target_origin() -> LoadableTargetOrigin:
+    # The container image is passed to the workspace separately, so every workspace can
+    # share the same origin
+    return LoadableTargetOrigin(
+        python_file=repo.__file__,
+        attribute=repo.repository.name,
+    )
+
+
+@pytest.fixture(scope="package")
+def workspace(
+    shared_instance: DagsterInstance, loadable_target_origin: LoadableTargetOrigin, image: str
+) -> Iterator[WorkspaceRequestContext]:
     with in_process_test_workspace(
-        instance,
-        loadable_target_origin=LoadableTargetOrigin(
-            python_file=repo.__file__,
-            attribute=repo.repository.name,
-        ),
+        shared_instance,
+        loadable_target_origin=loadable_target_origin,
         container_image=image,
     ) as workspace:
         yield workspace
 
 
-@pytest.fixture
+@pytest.fixture(scope="package")
 def other_workspace(
-    instance: DagsterInstance, other_image: str
+    shared_instance: DagsterInstance, loadable_target_origin: LoadableTargetOrigin, other_image: str
 ) -> Iterator[WorkspaceRequestContext]:
     with in_process_test_workspace(
-        instance,
-        loadable_target_origin=LoadableTargetOrigin(
-            python_file=repo.__file__,
-            attribute=repo.repository.name,
-        ),
+        shared_instance,
+        loadable_target_origin=loadable_target_origin,
         container_image=other_image,
     ) as workspace:
         yield workspace
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def job() -> JobDefinition:
     return repo.job
 
 
-@pytest.fixture
+@pytest.fixture(scope="package")
 def external_job(workspace: WorkspaceRequestContext) -> ExternalJob:
     location = workspace.get_code_location(workspace.code_location_names[0])
     return location.get_repository(repo.repository.name).get_full_external_job(repo.job.name)
 
 
-@pytest.fixture
+@pytest.fixture(scope="package")
 def other_external_job(other_workspace: WorkspaceRequestContext) -> ExternalJob:
     location = other_workspace.get_code_location(other_workspace.code_location_names[0])
     return location.get_repository(repo.repository.name).get_full_external_job(repo.job.name)
 
 
+@pytest.fixture(scope="package")
+def external_job_origin(external_job: ExternalJob) -> ExternalJobOrigin:
+    return external_job.get_external_origin()
+
+
+@pytest.fixture(scope="package")
+def job_code_origin(external_job: ExternalJob) -> JobPythonOrigin:
+    return external_job.get_python_origin()
+
+
+@pytest.fixture(scope="package")
+def other_external_job_origin(other_external_job: ExternalJob) -> ExternalJobOrigin:
+    return other_external_job.get_external_origin()
+
+
+@pytest.fixture(scope="package")
+def other_job_code_origin(other_external_job: ExternalJob) -> JobPythonOrigin:
+    return other_external_job.get_python_origin()
+
+
 @pytest.fixture
-def run(instance: DagsterInstance, job: JobDefinition, external_job: ExternalJob) -> DagsterRun:
-    return instance.create_run_for_job(
-        job,
-        external_job_origin=external_job.get_external_origin(),
-        job_code_origin=external_job.get_python_origin(),
-    )
+def make_run(job: JobDefinition) -> Callable[..., DagsterRun]:
+    def _make_run(
+        instance: DagsterInstance,
+        external_job_origin: ExternalJobOrigin,
+        job_code_origin: JobPythonOrigin,
+    ) -> DagsterRun:
+        return instance.create_run_for_job(
+            job,
+            external_job_origin=external_job_origin,
+            job_code_origin=job_code_origin,
+        )
+
+    return _make_run
+
+
+@pytest.fixture
+def run(
+    make_run: Callable[..., DagsterRun],
+    instance: DagsterInstance,
+    external_job_origin: ExternalJobOrigin,
+    job_code_origin: JobPythonOrigin,
+) -> DagsterRun:
+    return make_run(instance, external_job_origin, job_code_origin)
 
 
 @pytest.fixture
 def other_run(
-    instance: DagsterInstance, job: JobDefinition, other_external_job: ExternalJob
+    make_run: Callable[..., DagsterRun],
+    instance: DagsterInstance,
+    other_external_job_origin: ExternalJobOrigin,
+    other_job_code_origin: JobPythonOrigin,
 ) -> DagsterRun:
-    return instance.create_run_for_job(
-        job,
-        external_job_origin=other_external_job.get_external_origin(),
-        job_code_origin=other_external_job.get_python_origin(),
-    )
+    return make_run(instance, other_external_job_origin, other_job_code_origin)
 
 
 @pytest.fixture
 def launch_run(
-    workspace: WorkspaceRequestContext, job: JobDefinition, external_job: ExternalJob
+    workspace: WorkspaceRequestContext,
+    job: JobDefinition,
+    external_job_origin: ExternalJobOrigin,
+    job_code_origin: JobPythonOrigin,
 ) -> Callable[[DagsterInstance], None]:
     def _launch_run(instance: DagsterInstance) -> None:
         run = instance.create_run_for_job(
             job,
-            external_job_origin=external_job.get_external_origin(),
-            job_code_origin=external_job.get_python_origin(),
+            external_job_origin=external_job_origin,
+            job_code_origin=job_code_origin,
         )
         instance.launch_run(run.run_id, workspace)
 
@@ -313,20 +490,18 @@ def _launch_run(instance: DagsterInstance) -> None:
 
 
 @pytest.fixture
-def custom_instance_cm(stub_aws, stub_ecs_metadata):
+def custom_instance_cm(shared_instance: DagsterInstance, ecs, stub_aws, stub_ecs_metadata):
     @contextmanager
     def cm(config=None):
-        overrides = {
-            "run_launcher": {
-                "module": "dagster_aws.ecs.test_utils",
-                "class": "CustomECSRunLauncher",
-                "config": {**(config or {})},
-            }
-        }
-        with instance_for_test(overrides) as dagster_instance:
+        run_launcher = (
+            _CUSTOM_RUN_LAUNCHER if config is None else {**_CUSTOM_RUN_LAUNCHER, "config": config}
+        )
+        with run_launcher_swapped(shared_instance, run_launcher) as dagster_instance:
             yield dagster_instance
 
-    return cm
+    yield cm
+
+    shared_instance.wipe()
 
 
 @pytest.fixture
@@ -337,16 +512,13 @@ def custom_instance(
         yield dagster_instance
 
 
-@pytest.fixture
+@pytest.fixture(scope="package")
 def custom_workspace(
-    custom_instance: DagsterInstance, image: str
+    shared_instance: DagsterInstance, loadable_target_origin: LoadableTargetOrigin, image: str
 ) -> Iterator[WorkspaceRequestContext]:
     with in_process_test_workspace(
-        custom_instance,
-        loadable_target_origin=LoadableTargetOrigin(
-            python_file=repo.__file__,
-            attribute=repo.repository.name,
-        ),
+        shared_instance,
+        loadable_target_origin=loadable_target_origin,
         container_image=image,
     ) as workspace:
         yield workspace
@@ -354,16 +526,15 @@ def custom_workspace(
 
 @pytest.fixture
 def custom_run(
-    custom_instance: DagsterInstance, job: JobDefinition, external_job: ExternalJob
+    make_run: Callable[..., DagsterRun],
+    custom_instance: DagsterInstance,
+    external_job_origin: ExternalJobOrigin,
+    job_code_origin: JobPythonOrigin,
 ) -> DagsterRun:
-    return custom_instance.create_run_for_job(
-        job,
-        external_job_origin=external_job.get_external_origin(),
-        job_code_origin=external_job.get_python_origin(),
-    )
+    return make_run(custom_instance, external_job_origin, job_code_origin)
 
 
-@pytest.fixture
+@pytest.fixture(scope="package")
 def tagged_secret(secrets_manager):
     # A secret tagged with "dagster"
     name = "tagged_secret"
@@ -376,7 +547,7 @@ def tagged_secret(secrets_manager):
     yield Secret(name, arn)
 
 
-@pytest.fixture
+@pytest.fixture(scope="package")
 def other_secret(secrets_manager):
     # A secret without a tag
     name = "other_secret"
@@ -388,7 +559,7 @@ def other_secret(secrets_manager):
     yield Secret(name, arn)
 
 
-@pytest.fixture
+@pytest.fixture(scope="package")
 def configured_secret(secrets_manager) -> Iterator[Secret]:
     name = "configured_secret"
     arn = secrets_manager.create_secret(
@@ -399,18 +570,15 @@ def configured_secret(secrets_manager) -> Iterator[Secret]:
     yield Secret(name, arn)
 
 
-@pytest.fixture
-def other_configured_secret(secrets_manager) -> Iterator[Secret]:
+@pytest.fixture(scope="session")
+def other_configured_secret(region: str) -> Secret:
+    # Only ever passed through container context config and never looked up in Secrets
+    # Manager, so an ARN-shaped string is enough
     name = "other_configured_secret"
-    arn = secrets_manager.create_secret(
-        Name=name,
-        SecretString=json.dumps({"goodnight": "moon"}),
-    )["ARN"]
+    return Secret(name, f"arn:aws:secretsmanager:{region}:123456789012:secret:{name}-abc123")
 
-    yield Secret(name, arn)
 
-
-@pytest.fixture
+@pytest.fixture(scope="package")
 def container_context_config(configured_secret: Secret) -> Mapping[str, Any]:
     return {
         "env_vars": ["SHARED_KEY=SHARED_VAL"],
@@ -481,7 +649,7 @@ def container_context_config(configured_secret: Secret) -> Mapping[str, Any]:
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def other_container_context_config(other_configured_secret):
     return {
         "env_vars": ["SHARED_OTHER_KEY=SHARED_OTHER_VAL"],
@@ -543,25 +711,29 @@ def other_container_context_config(other_configured_secret):
     }
 
 
+@pytest.fixture(scope="package")
+def job_code_origin_with_container_context(
+    job_code_origin: JobPythonOrigin, container_context_config
+) -> JobPythonOrigin:
+    return job_code_origin._replace(
+        repository_origin=job_code_origin.repository_origin._replace(
+            container_context=container_context_config,
+        )
+    )
+
+
 @pytest.fixture
 def launch_run_with_container_context(
     job: JobDefinition,
-    external_job: ExternalJob,
+    external_job_origin: ExternalJobOrigin,
+    job_code_origin_with_container_context: JobPythonOrigin,
     workspace: WorkspaceRequestContext,
-    container_context_config,
 ):
     def _launch_run(instance):
-        python_origin = external_job.get_python_origin()
-        python_origin = python_origin._replace(
-            repository_origin=python_origin.repository_origin._replace(
-                container_context=container_context_config,
-            )
-        )
-
         run = instance.create_run_for_job(
             job,
-            external_job_origin=external_job.get_external_origin(),
-            job_code_origin=python_origin,
+            external_job_origin=external_job_origin,
+            job_code_origin=job_code_origin_with_container_context,
         )
         instance.launch_run(run.run_id, workspace)
 
@@ -1,7 +1,7 @@
 import pytest
 
 
-def test_run_task_failure(ecs, instance, workspace, run):
+def test_run_task_failure(ecs, instance, workspace, run, monkeypatch):
     def run_task(self=ecs, **kwargs):
         self.stubber.activate()
         self.stubber.add_response(
@@ -20,7 +20,7 @@ def run_task(self=ecs, **kwargs):
         self.stubber.deactivate()
         return response
 
-    instance.run_launcher.ecs.run_task = run_task
+    monkeypatch.setattr(instance.run_launcher.ecs, "run_task", run_task)
 
     with pytest.raises(Exception) as ex:
         instance.launch_run(run.run_id, workspace)
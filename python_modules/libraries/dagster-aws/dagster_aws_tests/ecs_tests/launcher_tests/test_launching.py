@@ -114,7 +114,8 @@ def test_launcher_fargate_spot(
     ecs,
     instance_fargate_spot,
     workspace,
-    external_job,
+    external_job_origin,
+    job_code_origin,
     job,
     subnet,
     image,
@@ -123,8 +124,8 @@ def test_launcher_fargate_spot(
     instance = instance_fargate_spot
     run = instance.create_run_for_job(
         job,
-        external_job_origin=external_job.get_external_origin(),
-        job_code_origin=external_job.get_python_origin(),
+        external_job_origin=external_job_origin,
+        job_code_origin=job_code_origin,
     )
     initial_task_definitions = ecs.list_task_definitions()["taskDefinitionArns"]
     initial_tasks = ecs.list_tasks()["taskArns"]
@@ -150,8 +151,8 @@ def test_launcher_fargate_spot(
     # Override capacity provider strategy with tags
     run = instance.create_run_for_job(
         job,
-        external_job_origin=external_job.get_external_origin(),
-        job_code_origin=external_job.get_python_origin(),
+        external_job_origin=external_job_origin,
+        job_code_origin=job_code_origin,
     )
     instance.add_run_tags(
         run.run_id,
@@ -190,7 +191,8 @@ def test_launcher_dont_use_current_task(
     ecs,
     instance_dont_use_current_task,
     workspace,
-    external_job,
+    external_job_origin,
+    job_code_origin,
     job,
     subnet,
     image,
@@ -199,8 +201,8 @@ def test_launcher_dont_use_current_task(
     instance = instance_dont_use_current_task
     run = instance.create_run_for_job(
         job,
-        external_job_origin=external_job.get_external_origin(),
-        job_code_origin=external_job.get_python_origin(),
+        external_job_origin=external_job_origin,
+        job_code_origin=job_code_origin,
     )
 
     cluster = instance.run_launcher.run_task_kwargs["cluster"]
@@ -275,7 +277,7 @@ def test_launcher_dont_use_current_task(
 
 
 def test_task_definition_registration(
-    ecs, instance, workspace, run, other_workspace, other_run, secrets_manager, monkeypatch
+    ecs, instance, workspace, run, other_workspace, other_run, secrets_manager, monkeypatch, request
 ):
     initial_task_definitions = ecs.list_task_definitions()["taskDefinitionArns"]
     _initial_tasks = ecs.list_tasks()["taskArns"]
@@ -305,6 +307,11 @@ def test_task_definition_registration(
         SecretString="hello",
         Tags=[{"Key": "dagster", "Value": "true"}],
     )
+    # The secrets manager is shared across tests so don't leak the new tagged secret, even
+    # if an assertion below fails
+    request.addfinalizer(
+        lambda: secrets_manager.delete_secret(SecretId="hello", ForceDeleteWithoutRecovery=True)
+    )
 
     instance.launch_run(other_run.run_id, other_workspace)
     assert len(ecs.list_task_definitions()["taskDefinitionArns"]) == len(task_definitions) + 1
@@ -550,7 +557,9 @@ def test_reuse_task_definition(instance, ecs):
     )
 
 
-def test_default_task_definition_resources(ecs, instance_cm, run, workspace, job, external_job):
+def test_default_task_definition_resources(
+    ecs, instance_cm, run, workspace, job, external_job_origin, job_code_origin
+):
     task_role_arn = "fake-task-role"
     execution_role_arn = "fake-execution-role"
     with instance_cm(
@@ -563,8 +572,8 @@ def test_default_task_definition_resources(ecs, instance_cm, run, workspace, job
     ) as instance:
         run = instance.create_run_for_job(
             job,
-            external_job_origin=external_job.get_external_origin(),
-            job_code_origin=external_job.get_python_origin(),
+            external_job_origin=external_job_origin,
+            job_code_origin=job_code_origin,
         )
         initial_tasks = ecs.list_tasks()["taskArns"]
 
@@ -597,8 +606,8 @@ def test_default_task_definition_resources(ecs, instance_cm, run, workspace, job
     ) as instance:
         run = instance.create_run_for_job(
             job,
-            external_job_origin=external_job.get_external_origin(),
-            job_code_origin=external_job.get_python_origin(),
+            external_job_origin=external_job_origin,
+            job_code_origin=job_code_origin,
         )
         initial_tasks = ecs.list_tasks()["taskArns"]
 
@@ -631,8 +640,8 @@ def test_default_task_definition_resources(ecs, instance_cm, run, workspace, job
     ) as instance:
         run = instance.create_run_for_job(
             job,
-            external_job_origin=external_job.get_external_origin(),
-            job_code_origin=external_job.get_python_origin(),
+            external_job_origin=external_job_origin,
+            job_code_origin=job_code_origin,
         )
         initial_tasks = ecs.list_tasks()["taskArns"]
 
@@ -654,7 +663,9 @@ def test_default_task_definition_resources(ecs, instance_cm, run, workspace, job
         assert task_definition["ephemeralStorage"]["sizeInGiB"] == 36
 
 
-def test_launching_with_task_definition_dict(ecs, instance_cm, run, workspace, job, external_job):
+def test_launching_with_task_definition_dict(
+    ecs, instance_cm, run, workspace, job, external_job_origin, job_code_origin
+):
     container_name = "dagster"
 
     task_role_arn = "fake-task-role"
@@ -706,8 +717,8 @@ def test_launching_with_task_definition_dict(ecs, instance_cm, run, workspace, j
     ) as instance:
         run = instance.create_run_for_job(
             job,
-            external_job_origin=external_job.get_external_origin(),
-            job_code_origin=external_job.get_python_origin(),
+            external_job_origin=external_job_origin,
+            job_code_origin=job_code_origin,
         )
 
         initial_task_definitions = ecs.list_task_definitions()["taskDefinitionArns"]
@@ -761,8 +772,8 @@ def test_launching_with_task_definition_dict(ecs, instance_cm, run, workspace, j
 
         second_run = run = instance.create_run_for_job(
             job,
-            external_job_origin=external_job.get_external_origin(),
-            job_code_origin=external_job.get_python_origin(),
+            external_job_origin=external_job_origin,
+            job_code_origin=job_code_origin,
         )
 
         instance.launch_run(second_run.run_id, workspace)
@@ -771,7 +782,9 @@ def test_launching_with_task_definition_dict(ecs, instance_cm, run, workspace, j
         assert ecs.list_task_definitions()["taskDefinitionArns"] == new_task_definitions
 
 
-def test_launching_custom_task_definition(ecs, instance_cm, run, workspace, job, external_job):
+def test_launching_custom_task_definition(
+    ecs, instance_cm, run, workspace, job, external_job_origin, job_code_origin
+):
     container_name = "override_container"
 
     task_definition = ecs.register_task_definition(
@@ -804,8 +817,8 @@ def test_launching_custom_task_definition(ecs, instance_cm, run, workspace, job,
     ) as instance:
         run = instance.create_run_for_job(
             job,
-            external_job_origin=external_job.get_external_origin(),
-            job_code_origin=external_job.get_python_origin(),
+            external_job_origin=external_job_origin,
+            job_code_origin=job_code_origin,
         )
 
         initial_task_definitions = ecs.list_task_definitions()["taskDefinitionArns"]
@@ -871,7 +884,9 @@ def exploding_describe_tasks(*_args, **_kwargs):
         instance.launch_run(run.run_id, workspace)
 
 
-@pytest.mark.parametrize("assign_public_ip", [True, False])
+@pytest.mark.parametrize(
+    "assign_public_ip", [True, False], ids=["public", "private"], indirect=True
+)
 def test_public_ip_assignment(ecs, ec2, instance, workspace, run, assign_public_ip):
     initial_tasks = ecs.list_tasks()["taskArns"]
 
@@ -892,14 +907,15 @@ def test_launcher_run_resources(
     ecs,
     instance_with_resources,
     workspace,
-    external_job,
+    external_job_origin,
+    job_code_origin,
     job,
 ):
     instance = instance_with_resources
     run = instance.create_run_for_job(
         job,
-        external_job_origin=external_job.get_external_origin(),
-        job_code_origin=external_job.get_python_origin(),
+        external_job_origin=external_job_origin,
+        job_code_origin=job_code_origin,
     )
 
     existing_tasks = ecs.list_tasks()["taskArns"]
@@ -914,7 +930,9 @@ def test_launcher_run_resources(
     assert task.get("overrides").get("cpu") == "1024"
 
 
-def test_launch_cannot_use_system_tags(instance_cm, workspace, job, external_job):
+def test_launch_cannot_use_system_tags(
+    instance_cm, workspace, job, external_job_origin, job_code_origin
+):
     with instance_cm(
         {
             "run_ecs_tags": [{"key": "dagster/run_id", "value": "NOPE"}],
@@ -922,8 +940,8 @@ def test_launch_cannot_use_system_tags(instance_cm, workspace, job, external_job
     ) as instance:
         run = instance.create_run_for_job(
             job,
-            external_job_origin=external_job.get_external_origin(),
-            job_code_origin=external_job.get_python_origin(),
+            external_job_origin=external_job_origin,
+            job_code_origin=job_code_origin,
         )
         with pytest.raises(Exception, match="Cannot override system ECS tag: dagster/run_id"):
             instance.launch_run(run.run_id, workspace)
@@ -1055,7 +1073,8 @@ def test_status(
     ecs,
     instance_with_log_group,
     job,
-    external_job,
+    external_job_origin,
+    job_code_origin,
     cloudwatch_client,
     log_group,
 ):
@@ -1063,8 +1082,8 @@ def test_status(
 
     run = instance.create_run_for_job(
         job,
-        external_job_origin=external_job.get_external_origin(),
-        job_code_origin=external_job.get_python_origin(),
+        external_job_origin=external_job_origin,
+        job_code_origin=job_code_origin,
         tags={RUN_WORKER_ID_TAG: "abcdef"},
     )
 
@@ -1146,8 +1165,8 @@ def test_status(
     # STARTING runs with these errors are considered a transient failure that can be retried
     starting_run = instance.create_run_for_job(
         job,
-        external_job_origin=external_job.get_external_origin(),
-        job_code_origin=external_job.get_python_origin(),
+        external_job_origin=external_job_origin,
+        job_code_origin=job_code_origin,
         status=DagsterRunStatus.STARTING,
         tags={RUN_WORKER_ID_TAG: "efghi"},
     )
@@ -1167,7 +1186,7 @@ def test_overrides_too_long(
     instance,
     workspace,
     job,
-    external_job,
+    external_job_origin,
 ):
     large_container_context = {i: "boom" for i in range(10000)}
 
@@ -1186,7 +1205,7 @@ def test_overrides_too_long(
 
     run = instance.create_run_for_job(
         job,
-        external_job_origin=external_job.get_external_origin(),
+        external_job_origin=external_job_origin,
         job_code_origin=mock_job_code_origin,
     )
 
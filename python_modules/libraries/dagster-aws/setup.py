@@ -44,7 +44,6 @@ def get_version() -> str:
         "pyspark": ["dagster-pyspark"],
         "test": [
             "moto>=2.2.8",
-            "requests-mock",
             "xmltodict==0.12.0",  # pinned until moto>=3.1.9 (https://github.com/spulec/moto/issues/5112)
         ],
     },